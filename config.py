@@ -8,7 +8,7 @@ Usage:
 """
 
 import os
-from pathlib import Path
+import sys
 
 # vLLM Configuration
 VLLM_CONFIG = {
@@ -43,6 +43,12 @@ EXTRACTION_FIELDS = {
     ]
 }
 
+# Set views of the field lists for O(1) membership tests
+REQUIRED_FIELDS_SET = frozenset(map(sys.intern, EXTRACTION_FIELDS["required_fields"]))
+OPTIONAL_FIELDS_SET = frozenset(map(sys.intern, EXTRACTION_FIELDS["optional_fields"]))
+CUSTOM_FIELDS_SET = frozenset(map(sys.intern, EXTRACTION_FIELDS["custom_fields"]))
+ALL_FIELDS_SET = REQUIRED_FIELDS_SET | OPTIONAL_FIELDS_SET | CUSTOM_FIELDS_SET
+
 # Language and Locale Configuration
 LOCALE_CONFIG = {
     "default_currency": os.getenv("DEFAULT_CURRENCY", "CHF"),
@@ -92,9 +98,18 @@ DIRECTORIES = {
     "backup_dir": os.getenv("BACKUP_DIR", "./backups")
 }
 
-# Ensure directories exist
-for dir_path in DIRECTORIES.values():
-    Path(dir_path).mkdir(parents=True, exist_ok=True)
+_DIRS_READY = False
+
+def ensure_directories():
+    """Create the configured directories if they do not exist yet"""
+    global _DIRS_READY
+    if _DIRS_READY:
+        return
+    
+    for dir_path in DIRECTORIES.values():
+        if not os.path.isdir(dir_path):
+            os.makedirs(dir_path, exist_ok=True)
+    _DIRS_READY = True
 
 def get_config(section=None):
     """Get configuration section or all config"""
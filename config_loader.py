@@ -1,27 +1,291 @@
 #!/usr/bin/env python3
 """
 Flexible configuration loader for Enhanced Invoice Metadata Extractor
-Supports both Python (.py) and JSON (.json) configuration files
+Supports Python (.py), JSON (.json) and YAML (.yaml/.yml) configuration files
 """
 
+import functools
+import hashlib
 import json
+import marshal
 import os
 import logging
-from pathlib import Path
-from typing import Dict, Any, Optional
+import pickle
+import struct
+import sys
+from collections import ChainMap, deque
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Tuple
 import importlib.util
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import yaml
+    try:
+        from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+    except ImportError:
+        from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+except ImportError:
+    yaml = None
+
 logger = logging.getLogger(__name__)
 
+# Parsed configuration files shared by all loader instances, keyed by
+# absolute path (relative paths resolve differently after os.chdir).
+# Values are (st_mtime_ns, st_size, data); a stat mismatch means the file was
+# edited. The data is frozen read-only and every load wraps it in a fresh
+# LazyConfig, so runtime edits and env overrides stay with that one result.
+_CONFIG_CACHE: Dict[str, Tuple[int, int, Mapping[str, Any]]] = {}
+
+# Sections streamed by load_section, keyed by (absolute path, section) and
+# validated and frozen the same way
+_SECTION_CACHE: Dict[Tuple[str, str], Tuple[int, int, Any]] = {}
+
+def _to_bool(value: str) -> bool:
+    """Convert an environment variable string to a boolean"""
+    return value.lower() == 'true'
+
+class LazyConfig(Mapping):
+    """Loaded configuration whose sections are overlaid on defaults on first access
+    
+    Each dict section is a ChainMap of (overrides, loaded values, defaults):
+    lookups fall through to the defaults without copying them, and writes
+    (including environment overrides) land in the front map only.
+    """
+    
+    def __init__(self, loaded: Dict[str, Any], defaults: Dict[str, Any]):
+        self._loaded = loaded
+        self._defaults = defaults
+        self._overrides: Dict[str, Dict[str, Any]] = {}
+        self._sections: Dict[str, Any] = {}
+    
+    def add_override(self, section: str, key: str, value: Any):
+        """Set section.key in the section's front map"""
+        self._overrides.setdefault(section, {})[key] = value
+    
+    def __getitem__(self, section: str) -> Any:
+        try:
+            return self._sections[section]
+        except KeyError:
+            pass
+        
+        if section in self._loaded:
+            values = self._loaded[section]
+            layers = [values] if isinstance(values, Mapping) else None
+        elif section in self._defaults:
+            layers = []
+        else:
+            raise KeyError(section)
+        
+        if layers is not None:
+            default = self._defaults.get(section)
+            if isinstance(default, Mapping):
+                layers.append(default)
+            values = ChainMap(self._overrides.setdefault(section, {}), *layers)
+        
+        self._sections[section] = values
+        return values
+    
+    def __contains__(self, section: object) -> bool:
+        return section in self._defaults or section in self._loaded
+    
+    def __iter__(self):
+        yield from self._defaults
+        for section in self._loaded:
+            if section not in self._defaults:
+                yield section
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Materialize every section into a plain dictionary"""
+        return _to_builtin(self)
+
+# Formats whose parse result depends only on the file contents, so it can be
+# pickled next to the file. Python configs are excluded: executing them reads
+# the environment (os.getenv), which a sidecar would freeze.
+_SIDECAR_SUFFIXES = ('.json', '.yaml', '.yml')
+
+# Source st_mtime_ns and st_size stored after the magic number of compiled
+# Python configs
+_PYC_SOURCE_STAT = struct.Struct('<qq')
+
+# Config files looked up in the working directory, in order of preference
+_LOCAL_CONFIG_NAMES = (
+    "config.yaml",
+    "config.yml",
+    "config.json",
+    "config.py",
+    "invoice_extractor_config.json",
+    "invoice_extractor_config.py"
+)
+
+def _freeze(value: Any) -> Any:
+    """Wrap nested dicts in read-only MappingProxyType views and lists in tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _to_builtin(value: Any) -> Any:
+    """Convert nested mappings (proxies, ChainMaps, LazyConfig) into plain dicts
+    and frozen tuples back into lists"""
+    if isinstance(value, Mapping):
+        return {k: _to_builtin(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(v) for v in value]
+    return value
+
+# Default configuration, built once and shared read-only by every loader
+_DEFAULT_CONFIG = _freeze({
+    "vllm": {
+        "base_url": "http://10.152.220.10:9901/v1",
+        "timeout": 30,
+        "max_retries": 3,
+        "temperature": 0.1,
+        "max_tokens": 1000,
+        "model": "default"
+    },
+    "processing": {
+        "content_truncate_length": 2000,
+        "max_content_for_llm": 4000,
+        "batch_size": 10,
+        "enable_parallel_processing": False
+    },
+    "extraction_fields": {
+        "required_fields": [
+            "invoice_number", "invoice_date", "total_amount", "client_name"
+        ],
+        "optional_fields": [
+            "due_date", "tax_amount", "customer_number", "reference",
+            "company_name", "payment_status", "currency", "line_items"
+        ],
+        "custom_fields": [
+            "delivery_date", "purchase_order_number", "payment_terms",
+            "billing_address", "shipping_address"
+        ]
+    },
+    "locale": {
+        "default_currency": "CHF",
+        "date_formats": {
+            "german": ["%d.%m.%Y", "%d-%m-%Y"],
+            "english": ["%m/%d/%Y", "%Y-%m-%d"],
+            "iso": ["%Y-%m-%d"]
+        },
+        "currency_symbols": {
+            "CHF": ["CHF", "Fr.", "Fr"],
+            "EUR": ["EUR", "€", "Euro"],
+            "USD": ["USD", "$", "Dollar"]
+        }
+    },
+    "output": {
+        "default_output_file": "invoices_for_chromadb.json",
+        "backup_enabled": True,
+        "export_formats": ["json", "csv"],
+        "include_raw_content": True,
+        "include_extraction_metadata": True
+    },
+    "logging": {
+        "level": "INFO",
+        "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        "file_logging": True,
+        "log_file": "invoice_extraction.log"
+    },
+    "quality": {
+        "min_confidence_score": 0.5,
+        "enable_validation": True,
+        "flag_suspicious_amounts": True,
+        "max_amount_threshold": 100000,
+        "enable_duplicate_detection": True
+    },
+    "directories": {
+        "invoices_dir": "/opt/rag-preprocessor/storage/documents/stepx",
+        "output_dir": "./output",
+        "logs_dir": "./logs",
+        "backup_dir": "./backups"
+    }
+})
+
+_VALIDATED_SECTIONS = ('vllm', 'processing', 'output', 'directories', 'quality')
+
+@functools.lru_cache(maxsize=32)
+def _validate_frozen(frozen: Tuple[Any, ...]) -> Tuple[str, ...]:
+    """Validate the config values captured by ConfigurationLoader.validate_config"""
+    present, base_url, timeout, invoices_dir, confidence = frozen
+    issues = []
+    
+    # Check required sections
+    required_sections = ['vllm', 'processing', 'output', 'directories']
+    for section in required_sections:
+        if section not in present:
+            issues.append(f"Missing required section: {section}")
+    
+    # Validate vLLM configuration
+    if 'vllm' in present:
+        if not base_url:
+            issues.append("vLLM base_url is required")
+        if timeout <= 0:
+            issues.append("vLLM timeout must be positive")
+    
+    # Validate directories
+    if 'directories' in present:
+        if not invoices_dir:
+            issues.append("invoices_dir is required")
+    
+    # Validate quality settings
+    if 'quality' in present:
+        if not 0 <= confidence <= 1:
+            issues.append("min_confidence_score must be between 0 and 1")
+    
+    return tuple(issues)
+
 class ConfigurationLoader:
     """Flexible configuration loader supporting multiple formats"""
     
+    # Environment variables that override config values: env_var -> (section, key, converter)
+    _ENV_MAPPINGS = {
+        'VLLM_URL': ('vllm', 'base_url', str),
+        'VLLM_TIMEOUT': ('vllm', 'timeout', int),
+        'VLLM_MODEL': ('vllm', 'model', str),
+        'VLLM_TEMPERATURE': ('vllm', 'temperature', float),
+        'VLLM_MAX_TOKENS': ('vllm', 'max_tokens', int),
+        'BATCH_SIZE': ('processing', 'batch_size', int),
+        'ENABLE_PARALLEL': ('processing', 'enable_parallel_processing', _to_bool),
+        'LOG_LEVEL': ('logging', 'level', str),
+        'OUTPUT_FILE': ('output', 'default_output_file', str),
+        'BACKUP_ENABLED': ('output', 'backup_enabled', _to_bool),
+        'INVOICES_DIR': ('directories', 'invoices_dir', str),
+        'MIN_CONFIDENCE': ('quality', 'min_confidence_score', float)
+    }
+    
     def __init__(self):
-        self.config_cache = {}
-        self.default_config = self._get_default_config()
+        self.default_config = _DEFAULT_CONFIG
+        self.refresh_env()
+    
+    def refresh_env(self):
+        """Re-read the environment variables used for config overrides"""
+        self._env_snapshot = {env_var: os.environ[env_var]
+                              for env_var in self._ENV_MAPPINGS
+                              if env_var in os.environ}
     
-    def load_config(self, config_path: Optional[str] = None) -> Dict[str, Any]:
-        """Load configuration from file or return defaults"""
+    def load_config(self, config_path: Optional[str] = None) -> LazyConfig:
+        """Load configuration from file or return defaults
+        
+        The result is a read-through mapping; use to_dict() for a plain
+        (e.g. JSON-serializable) copy.
+        """
         
         # Try to find config file automatically if not provided
         if not config_path:
@@ -29,217 +293,313 @@ class ConfigurationLoader:
         
         if not config_path:
             logger.info("No configuration file found, using defaults")
-            return self.default_config
+            return LazyConfig({}, self.default_config)
         
-        # Check cache
-        if config_path in self.config_cache:
-            return self.config_cache[config_path]
-        
-        config_path = Path(config_path)
+        config_path = os.fspath(config_path)
         
         try:
-            if config_path.suffix.lower() == '.json':
-                config = self._load_json_config(config_path)
-            elif config_path.suffix.lower() == '.py':
-                config = self._load_python_config(config_path)
-            else:
-                logger.warning(f"Unsupported config format: {config_path.suffix}")
-                config = self.default_config
+            # Check cache
+            st = os.stat(config_path)
+            data = self._cached_data(config_path, st)
+            if data is None:
+                data = self._read_config_data(config_path, st)
+                logger.info(f"Configuration loaded from: {config_path}")
             
             # Merge with defaults to ensure all keys exist
-            config = self._merge_with_defaults(config)
+            config = self._merge_with_defaults(data)
             
             # Apply environment variable overrides
             config = self._apply_env_overrides(config)
             
-            # Cache the loaded config
-            self.config_cache[str(config_path)] = config
-            
-            logger.info(f"Configuration loaded from: {config_path}")
             return config
             
         except Exception as e:
             logger.error(f"Error loading config from {config_path}: {e}")
             logger.info("Falling back to default configuration")
-            return self.default_config
+            return LazyConfig({}, self.default_config)
+    
+    @staticmethod
+    def _cached_data(config_path: str, st: os.stat_result) -> Optional[Mapping[str, Any]]:
+        """Return the memoized file data for config_path if the file is unchanged since"""
+        cached = _CONFIG_CACHE.get(os.path.abspath(config_path))
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        return None
+    
+    def _read_config_data(self, config_path: str, st: os.stat_result) -> Mapping[str, Any]:
+        """Parse a config file (or reuse its sidecar) and memoize the frozen result"""
+        cache_key = (os.path.realpath(config_path), st.st_mtime_ns, st.st_size)
+        use_sidecar = os.path.splitext(config_path)[1].lower() in _SIDECAR_SUFFIXES
+        
+        config = self._read_sidecar(config_path, cache_key) if use_sidecar else None
+        if config is None:
+            config = self._parse_config_file(config_path)
+            if config is None:
+                logger.warning(f"Unsupported config format: {os.path.splitext(config_path)[1]}")
+                config = {}
+            elif use_sidecar:
+                self._write_sidecar(config_path, cache_key, config)
+        
+        self._intern_strings(config)
+        
+        data = _freeze(config)
+        _CONFIG_CACHE[os.path.abspath(config_path)] = (st.st_mtime_ns, st.st_size, data)
+        return data
+    
+    def _parse_config_file(self, config_path: str) -> Optional[Dict[str, Any]]:
+        """Parse a configuration file, or return None for unsupported formats"""
+        suffix = os.path.splitext(config_path)[1].lower()
+        if suffix == '.json':
+            return self._load_json_config(config_path)
+        if suffix == '.py':
+            return self._load_python_config(config_path)
+        if suffix in ('.yaml', '.yml'):
+            return self._load_yaml_config(config_path)
+        return None
+    
+    @staticmethod
+    def _sidecar_path(config_path: str) -> str:
+        """Path of the pickled parse cache stored next to a config file"""
+        return config_path + '.cache.pkl'
+    
+    def _read_sidecar(self, config_path: str, cache_key: Tuple[str, int, int]) -> Optional[Dict[str, Any]]:
+        """Return the parsed config from the sidecar if it matches cache_key"""
+        sidecar = self._sidecar_path(config_path)
+        try:
+            with open(sidecar, 'rb') as f:
+                if pickle.load(f) != cache_key:
+                    return None
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable config cache {sidecar}: {e}")
+            return None
+    
+    def _write_sidecar(self, config_path: str, cache_key: Tuple[str, int, int], config: Dict[str, Any]):
+        """Atomically write the parsed config next to the source file"""
+        sidecar = self._sidecar_path(config_path)
+        tmp_path = f"{sidecar}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(cache_key, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(config, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, sidecar)
+        except Exception as e:
+            logger.debug(f"Could not write config cache {sidecar}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    
+    def load_section(self, section_name: str, config_path: str) -> Mapping[str, Any]:
+        """Load a single section of a JSON config without building the others"""
+        config_path = os.fspath(config_path)
+        
+        try:
+            st = os.stat(config_path)
+        except OSError:
+            return self.load_config(config_path).get(section_name, {})
+        
+        # A config already loaded in full, or this section streamed before,
+        # answers from memory
+        data = self._cached_data(config_path, st)
+        if data is None:
+            section_key = (os.path.abspath(config_path), section_name)
+            cached = _SECTION_CACHE.get(section_key)
+            if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                values = cached[2]
+            else:
+                try:
+                    values = _freeze(self._load_json_section(config_path, section_name))
+                except Exception as e:
+                    logger.debug(f"Streaming section {section_name} from {config_path} failed: {e}")
+                    return self.load_config(config_path).get(section_name, {})
+                _SECTION_CACHE[section_key] = (st.st_mtime_ns, st.st_size, values)
+            data = {section_name: values}
+        
+        try:
+            config = self._apply_env_overrides(LazyConfig(data, self.default_config))
+        except Exception as e:
+            # load_config reports the error and falls back to defaults
+            logger.debug(f"Applying overrides to section {section_name} failed: {e}")
+            return self.load_config(config_path).get(section_name, {})
+        return config.get(section_name, {})
     
     def _find_config_file(self) -> Optional[str]:
         """Automatically find configuration file"""
-        possible_configs = [
-            "config.json",
-            "config.py", 
-            "invoice_extractor_config.json",
-            "invoice_extractor_config.py",
-            os.path.expanduser("~/.invoice_extractor/config.json"),
-            "/etc/invoice_extractor/config.json"
-        ]
+        # One directory listing answers all local candidates
+        try:
+            with os.scandir('.') as entries:
+                local_files = {entry.name for entry in entries if entry.is_file()}
+        except OSError:
+            local_files = set()
         
-        for config_file in possible_configs:
+        for config_file in _LOCAL_CONFIG_NAMES:
+            if config_file in local_files:
+                return config_file
+        
+        for config_file in (os.path.expanduser("~/.invoice_extractor/config.json"),
+                            "/etc/invoice_extractor/config.json"):
             if os.path.exists(config_file):
                 return config_file
         
         return None
     
-    def _load_json_config(self, config_path: Path) -> Dict[str, Any]:
+    def _load_json_config(self, config_path: str) -> Dict[str, Any]:
         """Load JSON configuration file"""
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        with open(config_path, 'rb') as f:
+            buf = f.read()
+        
+        if orjson is not None:
+            config = orjson.loads(buf)
+        else:
+            config = json.loads(buf.decode('utf-8'))
         
         # Remove comment fields (fields starting with _)
         config = self._clean_json_comments(config)
         return config
     
-    def _load_python_config(self, config_path: Path) -> Dict[str, Any]:
+    def _load_yaml_config(self, config_path: str) -> Dict[str, Any]:
+        """Load YAML configuration file"""
+        if yaml is None:
+            raise ImportError("PyYAML is required to load YAML configs")
+        
+        with open(config_path, 'rb') as f:
+            config = yaml.load(f, Loader=_YamlLoader)
+        
+        return config or {}
+    
+    def _load_json_section(self, config_path: str, section_name: str) -> Dict[str, Any]:
+        """Stream one top-level section out of a JSON configuration file"""
+        with open(config_path, 'rb') as f:
+            section = dict(ijson.kvitems(f, section_name, use_float=True))
+        
+        return self._clean_json_comments(section)
+    
+    def _load_python_config(self, config_path: str) -> Dict[str, Any]:
         """Load Python configuration file"""
-        spec = importlib.util.spec_from_file_location("config", config_path)
-        config_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(config_module)
+        namespace = {'__name__': 'config', '__file__': config_path, '__builtins__': __builtins__}
+        exec(self._compile_python_config(config_path), namespace)
         
         # Extract configuration dictionaries
         config = {}
-        for attr_name in dir(config_module):
+        for attr_name, value in namespace.items():
             if attr_name.endswith('_CONFIG') or attr_name in ['DIRECTORIES']:
-                config[attr_name.lower().replace('_config', '')] = getattr(config_module, attr_name)
+                config[attr_name.lower().replace('_config', '')] = value
         
         return config
     
-    def _clean_json_comments(self, obj: Any) -> Any:
-        """Remove comment fields from JSON configuration"""
-        if isinstance(obj, dict):
-            return {k: self._clean_json_comments(v) for k, v in obj.items() 
-                   if not k.startswith('_')}
-        elif isinstance(obj, list):
-            return [self._clean_json_comments(item) for item in obj]
-        else:
-            return obj
-    
-    def _merge_with_defaults(self, config: Dict[str, Any]) -> Dict[str, Any]:
-        """Merge loaded config with defaults"""
-        merged = self.default_config.copy()
+    def _compile_python_config(self, config_path: str):
+        """Compile a Python config, reusing the marshalled code object while it is fresh"""
+        digest = hashlib.sha1(os.path.realpath(config_path).encode('utf-8')).hexdigest()[:16]
+        cache_dir = sys.pycache_prefix or os.path.join(os.path.dirname(config_path), '__pycache__')
+        stem = os.path.splitext(os.path.basename(config_path))[0]
+        pyc_path = os.path.join(cache_dir, f"{stem}.{digest}.config.pyc")
         
-        for section, values in config.items():
-            if section in merged:
-                if isinstance(values, dict) and isinstance(merged[section], dict):
-                    merged[section].update(values)
-                else:
-                    merged[section] = values
+        # Like CPython's .pyc header: the code is reused only while the source's
+        # mtime and size match exactly, so an older copy put in place is noticed
+        with open(config_path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            header = importlib.util.MAGIC_NUMBER + _PYC_SOURCE_STAT.pack(st.st_mtime_ns, st.st_size)
+            
+            try:
+                with open(pyc_path, 'rb') as pyc:
+                    if pyc.read(len(header)) == header:
+                        return marshal.load(pyc)
+            except (OSError, EOFError, ValueError, TypeError):
+                pass
+            
+            source = f.read()
+        code = compile(source, config_path, 'exec')
+        
+        tmp_path = f"{pyc_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(header)
+                marshal.dump(code, f)
+            os.replace(tmp_path, pyc_path)
+        except OSError as e:
+            logger.debug(f"Could not write compiled config {pyc_path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        
+        return code
+    
+    def _clean_json_comments(self, obj: Any) -> Any:
+        """Remove comment fields from JSON configuration (in place)"""
+        stack = deque([obj])
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                for key in [k for k in node if k.startswith('_')]:
+                    del node[key]
+                children = node.values()
+            elif isinstance(node, list):
+                children = node
             else:
-                merged[section] = values
+                continue
+            stack.extend(child for child in children if isinstance(child, (dict, list)))
+        return obj
+    
+    def _intern_strings(self, config: Dict[str, Any]):
+        """Intern repeated strings (currencies, formats, field names) in place"""
+        output = config.get('output')
+        fields = config.get('extraction_fields')
+        targets = [config.get('locale')]
+        if isinstance(output, dict):
+            targets.append(output.get('export_formats'))
+        if isinstance(fields, dict):
+            targets.extend(v for k, v in fields.items() if k.endswith('_fields'))
         
-        return merged
+        stack = deque(t for t in targets if isinstance(t, (dict, list)))
+        while stack:
+            node = stack.pop()
+            for k, v in (node.items() if isinstance(node, dict) else enumerate(node)):
+                if isinstance(v, str):
+                    node[k] = sys.intern(v)
+                elif isinstance(v, (dict, list)):
+                    stack.append(v)
+    
+    def _merge_with_defaults(self, config: Dict[str, Any]) -> LazyConfig:
+        """Merge loaded config with defaults, one section at a time on access"""
+        return LazyConfig(config, self.default_config)
     
-    def _apply_env_overrides(self, config: Dict[str, Any]) -> Dict[str, Any]:
+    def _apply_env_overrides(self, config: LazyConfig) -> LazyConfig:
         """Apply environment variable overrides"""
-        env_mappings = {
-            'VLLM_URL': ('vllm', 'base_url'),
-            'VLLM_TIMEOUT': ('vllm', 'timeout'),
-            'VLLM_MODEL': ('vllm', 'model'),
-            'VLLM_TEMPERATURE': ('vllm', 'temperature'),
-            'VLLM_MAX_TOKENS': ('vllm', 'max_tokens'),
-            'BATCH_SIZE': ('processing', 'batch_size'),
-            'LOG_LEVEL': ('logging', 'level'),
-            'OUTPUT_FILE': ('output', 'default_output_file'),
-            'INVOICES_DIR': ('directories', 'invoices_dir'),
-            'MIN_CONFIDENCE': ('quality', 'min_confidence_score')
-        }
+        if not self._env_snapshot:
+            return config
         
-        for env_var, (section, key) in env_mappings.items():
-            if env_var in os.environ:
-                value = os.environ[env_var]
-                
-                # Type conversion
-                if key in ['timeout', 'max_tokens', 'batch_size']:
-                    value = int(value)
-                elif key in ['temperature', 'min_confidence_score']:
-                    value = float(value)
-                elif key in ['enable_parallel_processing', 'backup_enabled']:
-                    value = value.lower() == 'true'
-                
-                if section in config:
-                    config[section][key] = value
-                    logger.info(f"Environment override: {env_var} -> {section}.{key} = {value}")
+        for env_var, raw_value in self._env_snapshot.items():
+            section, key, convert = self._ENV_MAPPINGS[env_var]
+            value = convert(raw_value)
+            
+            if section in config:
+                config.add_override(section, key, value)
+                logger.info(f"Environment override: {env_var} -> {section}.{key} = {value}")
         
         return config
     
-    def _get_default_config(self) -> Dict[str, Any]:
-        """Get default configuration"""
-        return {
-            "vllm": {
-                "base_url": "http://10.152.220.10:9901/v1",
-                "timeout": 30,
-                "max_retries": 3,
-                "temperature": 0.1,
-                "max_tokens": 1000,
-                "model": "default"
-            },
-            "processing": {
-                "content_truncate_length": 2000,
-                "max_content_for_llm": 4000,
-                "batch_size": 10,
-                "enable_parallel_processing": False
-            },
-            "extraction_fields": {
-                "required_fields": [
-                    "invoice_number", "invoice_date", "total_amount", "client_name"
-                ],
-                "optional_fields": [
-                    "due_date", "tax_amount", "customer_number", "reference",
-                    "company_name", "payment_status", "currency", "line_items"
-                ],
-                "custom_fields": [
-                    "delivery_date", "purchase_order_number", "payment_terms",
-                    "billing_address", "shipping_address"
-                ]
-            },
-            "locale": {
-                "default_currency": "CHF",
-                "date_formats": {
-                    "german": ["%d.%m.%Y", "%d-%m-%Y"],
-                    "english": ["%m/%d/%Y", "%Y-%m-%d"],
-                    "iso": ["%Y-%m-%d"]
-                },
-                "currency_symbols": {
-                    "CHF": ["CHF", "Fr.", "Fr"],
-                    "EUR": ["EUR", "€", "Euro"],
-                    "USD": ["USD", "$", "Dollar"]
-                }
-            },
-            "output": {
-                "default_output_file": "invoices_for_chromadb.json",
-                "backup_enabled": True,
-                "export_formats": ["json", "csv"],
-                "include_raw_content": True,
-                "include_extraction_metadata": True
-            },
-            "logging": {
-                "level": "INFO",
-                "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-                "file_logging": True,
-                "log_file": "invoice_extraction.log"
-            },
-            "quality": {
-                "min_confidence_score": 0.5,
-                "enable_validation": True,
-                "flag_suspicious_amounts": True,
-                "max_amount_threshold": 100000,
-                "enable_duplicate_detection": True
-            },
-            "directories": {
-                "invoices_dir": "/opt/rag-preprocessor/storage/documents/stepx",
-                "output_dir": "./output",
-                "logs_dir": "./logs",
-                "backup_dir": "./backups"
-            }
-        }
-    
     def save_config(self, config: Dict[str, Any], output_path: str, format_type: str = "json"):
         """Save configuration to file"""
-        output_path = Path(output_path)
+        config = _to_builtin(config)
         
         try:
             if format_type.lower() == "json":
+                if orjson is not None:
+                    with open(output_path, 'wb') as f:
+                        f.write(orjson.dumps(config, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+                else:
+                    with open(output_path, 'w', encoding='utf-8') as f:
+                        json.dump(config, f, indent=2, ensure_ascii=False)
+            elif format_type.lower() in ("yaml", "yml"):
+                if yaml is None:
+                    raise ImportError("PyYAML is required to save YAML configs")
                 with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(config, f, indent=2, ensure_ascii=False)
+                    yaml.dump(config, f, Dumper=_YamlDumper, sort_keys=False, allow_unicode=True)
             else:
                 raise ValueError(f"Unsupported save format: {format_type}")
             
@@ -250,46 +610,46 @@ class ConfigurationLoader:
     
     def validate_config(self, config: Dict[str, Any]) -> list:
         """Validate configuration and return list of issues"""
-        issues = []
-        
-        # Check required sections
-        required_sections = ['vllm', 'processing', 'output', 'directories']
-        for section in required_sections:
-            if section not in config:
-                issues.append(f"Missing required section: {section}")
-        
-        # Validate vLLM configuration
-        if 'vllm' in config:
-            vllm_config = config['vllm']
-            if not vllm_config.get('base_url'):
-                issues.append("vLLM base_url is required")
-            if vllm_config.get('timeout', 0) <= 0:
-                issues.append("vLLM timeout must be positive")
-        
-        # Validate directories
-        if 'directories' in config:
-            dirs = config['directories']
-            if not dirs.get('invoices_dir'):
-                issues.append("invoices_dir is required")
-        
-        # Validate quality settings
-        if 'quality' in config:
-            quality = config['quality']
-            confidence = quality.get('min_confidence_score', 0)
-            if not 0 <= confidence <= 1:
-                issues.append("min_confidence_score must be between 0 and 1")
-        
-        return issues
+        present = tuple(section for section in _VALIDATED_SECTIONS if section in config)
+        vllm_config = config['vllm'] if 'vllm' in present else {}
+        dirs = config['directories'] if 'directories' in present else {}
+        quality = config['quality'] if 'quality' in present else {}
+        
+        # Only these values influence the result, so they make a cheap memo key
+        frozen = (
+            present,
+            vllm_config.get('base_url'),
+            vllm_config.get('timeout', 0),
+            dirs.get('invoices_dir'),
+            quality.get('min_confidence_score', 0),
+        )
+        
+        try:
+            issues = _validate_frozen(frozen)
+        except TypeError:
+            # Unhashable values cannot be memoized
+            issues = _validate_frozen.__wrapped__(frozen)
+        
+        return list(issues)
 
 # Global configuration loader instance
 config_loader = ConfigurationLoader()
 
-def get_config(config_path: Optional[str] = None) -> Dict[str, Any]:
+def get_config(config_path: Optional[str] = None) -> LazyConfig:
     """Convenience function to get configuration"""
     return config_loader.load_config(config_path)
 
-def get_section(section_name: str, config_path: Optional[str] = None) -> Dict[str, Any]:
-    """Get specific configuration section"""
+def get_section(section_name: str, config_path: Optional[str] = None) -> Mapping[str, Any]:
+    """Get specific configuration section (a ChainMap over the defaults; dict() copies it)"""
+    if not config_path:
+        config_path = config_loader._find_config_file()
+    if config_path:
+        config_path = os.fspath(config_path)
+    
+    # JSON files can be streamed, skipping every other section
+    if ijson is not None and config_path and config_path.lower().endswith('.json'):
+        return config_loader.load_section(section_name, config_path)
+    
     config = get_config(config_path)
     return config.get(section_name, {})
 
@@ -298,11 +658,11 @@ if __name__ == "__main__":
     # Example: Load configuration
     config = get_config()
     print("Loaded configuration:")
-    print(json.dumps(config, indent=2))
+    print(json.dumps(config.to_dict(), indent=2))
     
     # Example: Get specific section
     vllm_config = get_section('vllm')
-    print(f"\nvLLM Configuration: {vllm_config}")
+    print(f"\nvLLM Configuration: {dict(vllm_config)}")
     
     # Example: Validate configuration
     issues = config_loader.validate_config(config)
@@ -5,24 +5,39 @@ Convert between JSON, YAML, and Python configuration formats
 """
 
 import argparse
+import os
 import sys
-from pathlib import Path
+from collections.abc import Mapping
 
 from config_loader import ConfigurationLoader
 
+_MISSING = '<missing>'
+
+def _flatten(config):
+    """Yield (dotted_key, value) for every leaf of a nested configuration"""
+    stack = [('', iter(config.items()))]
+    while stack:
+        prefix, items = stack[-1]
+        for k, v in items:
+            key = sys.intern(f"{prefix}.{k}" if prefix else str(k))
+            if isinstance(v, Mapping):
+                stack.append((key, iter(v.items())))
+                break
+            # Defaults hold lists as tuples; compare them like loaded lists
+            yield key, list(v) if isinstance(v, tuple) else v
+        else:
+            stack.pop()
+
 def migrate_config(input_file: str, output_file: str, output_format: str = None):
     """Migrate configuration from one format to another"""
     
-    input_path = Path(input_file)
-    output_path = Path(output_file)
-    
-    if not input_path.exists():
+    if not os.path.exists(input_file):
         print(f"❌ Input file not found: {input_file}")
         return False
     
     # Auto-detect output format if not specified
     if not output_format:
-        output_format = output_path.suffix.lstrip('.')
+        output_format = os.path.splitext(output_file)[1].lstrip('.')
         if output_format == 'yml':
             output_format = 'yaml'
     
@@ -31,10 +46,10 @@ def migrate_config(input_file: str, output_file: str, output_format: str = None)
     try:
         # Load configuration
         loader = ConfigurationLoader()
-        config = loader.load_config(str(input_path))
+        config = loader.load_config(input_file)
         
         # Save in new format
-        loader.save_config(config, str(output_path), output_format)
+        loader.save_config(config, output_file, output_format)
         
         print(f"✅ Migration successful!")
         print(f"📁 Output saved to: {output_file}")
@@ -115,32 +130,18 @@ def compare_configs(config1: str, config2: str):
         conf1 = loader.load_config(config1)
         conf2 = loader.load_config(config2)
         
+        # Walk conf2 once, consuming matching keys from conf1 as we go
+        flat1 = dict(_flatten(conf1))
         differences = []
-        all_keys = set()
-        
-        def flatten_dict(d, prefix=''):
-            """Flatten nested dictionary for comparison"""
-            items = []
-            for k, v in d.items():
-                new_key = f"{prefix}.{k}" if prefix else k
-                all_keys.add(new_key)
-                if isinstance(v, dict):
-                    items.extend(flatten_dict(v, new_key))
-                else:
-                    items.append((new_key, v))
-            return items
-        
-        flat1 = dict(flatten_dict(conf1))
-        flat2 = dict(flatten_dict(conf2))
-        
-        # Find differences
-        for key in all_keys:
-            val1 = flat1.get(key, '<missing>')
-            val2 = flat2.get(key, '<missing>')
-            
+        for key, val2 in _flatten(conf2):
+            val1 = flat1.pop(key, _MISSING)
             if val1 != val2:
                 differences.append((key, val1, val2))
         
+        # Whatever is left only exists in conf1
+        for key, val1 in flat1.items():
+            differences.append((key, val1, _MISSING))
+        
         if not differences:
             print("✅ Configurations are identical!")
         else:
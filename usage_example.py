@@ -3,6 +3,7 @@
 Usage example and testing utility for Enhanced Invoice Metadata Extractor
 """
 
+import asyncio
 import json
 import sys
 from pathlib import Path
@@ -11,7 +12,7 @@ from pathlib import Path
 # sys.path.append('/path/to/your/extractor')
 
 from invoice_metadata_extractor import EnhancedInvoiceMetadataExtractor
-from config import VLLM_CONFIG, PROCESSING_CONFIG, OUTPUT_CONFIG
+from config import VLLM_CONFIG, PROCESSING_CONFIG, OUTPUT_CONFIG, ensure_directories
 
 def test_single_invoice(invoice_file_path: str, vllm_url: str = None):
     """Test extraction on a single invoice file"""
@@ -33,7 +34,13 @@ def test_single_invoice(invoice_file_path: str, vllm_url: str = None):
     extractor = EnhancedInvoiceMetadataExtractor(invoices_dir, vllm_url)
     
     # Extract metadata
-    result = extractor.extract_metadata_from_invoice(invoice_data)
+    async def extract():
+        try:
+            return await extractor.extract_metadata_from_invoice(invoice_data)
+        finally:
+            await extractor.aclose()
+    
+    result = asyncio.run(extract())
     
     # Display results
     print(f"\n📄 Results for: {result['metadata'].get('original_filename', 'Unknown')}")
@@ -61,8 +68,6 @@ def test_vllm_connection(vllm_url: str = None):
     
     from invoice_metadata_extractor import vLLMClient
     
-    client = vLLMClient(vllm_url)
-    
     test_content = """
     RECHNUNG
     
@@ -77,7 +82,11 @@ def test_vllm_connection(vllm_url: str = None):
     Total: CHF 1,616.25
     """
     
-    result = client.extract_structured_data(test_content)
+    async def extract():
+        async with vLLMClient(vllm_url) as client:
+            return await client.extract_structured_data(test_content)
+    
+    result = asyncio.run(extract())
     
     if result:
         print("✅ vLLM connection successful!")
@@ -202,6 +211,8 @@ def main():
     
     args = parser.parse_args()
     
+    ensure_directories()
+    
     if args.action == 'test-connection':
         test_vllm_connection(args.vllm_url)
     